@@ -23,3 +23,10 @@ class KiwiSystemCrossprepareUnsupportedEnvironmentError(KiwiError):
     Exception raised if the environment to setup for cross build
     is not supported
     """
+
+
+class KiwiSystemCrossprepareProgressFdError(KiwiError):
+    """
+    Exception raised if the file descriptor given for the progress
+    event stream is not a number or not open
+    """
@@ -0,0 +1,126 @@
+# Copyright (c) 2022 Marcus Schäfer.  All rights reserved.
+#
+# This file is part of kiwi-crossprepare-build.
+#
+# kiwi-crossprepare-build is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# kiwi-crossprepare-build is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with kiwi-crossprepare-build.  If not, see <http://www.gnu.org/licenses/>
+#
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import (
+    Any, Dict, Iterator, Optional
+)
+
+from kiwi_crossprepare_plugin.exceptions import (
+    KiwiSystemCrossprepareProgressFdError
+)
+
+log = logging.getLogger('kiwi')
+
+
+class ProgressEvents:
+    """
+    **Machine readable progress event stream**
+
+    Writes one JSON object per line to the given file descriptor.
+    If no file descriptor is given all events are discarded.
+
+    :param int fd: open file descriptor to write events to
+    """
+    def __init__(self, fd: Optional[int] = None) -> None:
+        if fd is not None:
+            try:
+                os.fstat(fd)
+            except OSError as issue:
+                raise KiwiSystemCrossprepareProgressFdError(
+                    f'progress file descriptor {fd} is not open: {issue}'
+                )
+        self.fd = fd
+        self.copied_bytes = 0
+
+    def emit(self, event: str, **data: Any) -> None:
+        """
+        Write event with the given data as JSON line
+
+        :param str event: event name
+        :param dict data: event specific data
+        """
+        if self.fd is None:
+            return
+        record = {'time': time.time(), 'event': event}
+        record.update(data)
+        try:
+            os.write(self.fd, (json.dumps(record) + '\n').encode())
+        except OSError as issue:
+            log.warning(f'Disabled progress events: {issue}')
+            self.fd = None
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[Dict[str, Any]]:
+        """
+        Emit start and end of the given preparation phase
+
+        If the phase raises, a phase_failed event carrying the
+        error message is emitted instead of phase_end and the
+        exception is passed on. Data stored in the yielded dict
+        is added to the phase_end event.
+
+        :param str phase: phase name
+        """
+        result: Dict[str, Any] = {}
+        self.phase_start(phase)
+        try:
+            yield result
+        except Exception as issue:
+            self.emit(
+                'phase_failed', phase=phase,
+                error=f'{type(issue).__name__}: {issue}'
+            )
+            raise
+        self.phase_end(phase, **result)
+
+    def phase_start(self, phase: str) -> None:
+        """
+        Emit start of the given preparation phase
+
+        :param str phase: phase name
+        """
+        self.emit('phase_start', phase=phase)
+
+    def phase_end(self, phase: str, **data: Any) -> None:
+        """
+        Emit end of the given preparation phase
+
+        :param str phase: phase name
+        :param dict data: phase specific result data
+        """
+        self.emit('phase_end', phase=phase, **data)
+
+    def file_copied(self, source: str, target: str) -> None:
+        """
+        Emit copy progress for the given file
+
+        :param str source: source file path
+        :param str target: target file path
+        """
+        if self.fd is None:
+            return
+        size = os.path.getsize(target)
+        self.copied_bytes += size
+        self.emit(
+            'file_copied', source=source, target=target,
+            bytes=size, total_bytes=self.copied_bytes
+        )
@@ -19,6 +19,7 @@
 usage: kiwi-ng system crossprepare -h | --help
        kiwi-ng system crossprepare --target-arch=<arch> --init=<name> --target-dir=<directory>
            [--allow-existing-root]
+           [--warmup-cache] [--progress-fd=<fd>]
        kiwi-ng system crossprepare help
 
 commands:
@@ -49,14 +50,30 @@ options:
     --allow-existing-root
         allow to use an existing root directory from an earlier
         preparation attempt.
+    --warmup-cache
+        preload the QEMU emulator and static helper binaries placed
+        in the image root into the page cache before the init program
+        gets called. This makes the startup of the first emulated
+        binaries predictable if many preparations run concurrently.
+    --progress-fd=<fd>
+        write machine readable progress events as JSON lines to the
+        given open file descriptor. Events are emitted for the start
+        and end or failure of each preparation phase, per copied file
+        including its byte count, and for the init program PID and
+        exit status.
 """
 import logging
 import os
 import shutil
+import time
 from tempfile import TemporaryDirectory
 from textwrap import dedent
+from typing import (
+    List, Optional
+)
 
 from kiwi.command import Command
+from kiwi.command_process import CommandProcess
 from kiwi.path import Path
 from kiwi.tasks.base import CliTask
 from kiwi.help import Help
@@ -67,8 +84,10 @@ from kiwi.exceptions import (
 )
 
 from kiwi_crossprepare_plugin.exceptions import (
-    KiwiSystemCrossprepareUnsupportedEnvironmentError
+    KiwiSystemCrossprepareUnsupportedEnvironmentError,
+    KiwiSystemCrossprepareProgressFdError
 )
+from kiwi_crossprepare_plugin.progress import ProgressEvents
 
 log = logging.getLogger('kiwi')
 
@@ -100,6 +119,9 @@ class SystemCrossprepareTask(CliTask):
                 f'image target dir {target_dir!r} already exists'
             )
 
+        progress_fd = self.progress_fd()
+        progress = ProgressEvents(progress_fd)
+
         # Copy init binary with execution permissions to
         # python managed temporary directory
         init_dir = TemporaryDirectory(prefix='initvm_')
@@ -129,62 +151,147 @@ class SystemCrossprepareTask(CliTask):
             Path.create(target_bin_dir)
         if not os.path.isdir(target_image_dir):
             Path.create(target_image_dir)
-        log.info(f'Copying QEMU binaries to: {target_bin_dir!r}')
-        for qemu_binary in qemu_binaries:
-            if not os.path.exists(qemu_binary):
-                raise KiwiFileNotFound(
-                    f'QEMU binary {qemu_binary!r} not found'
+        emulator_files: List[str] = []
+        with progress.phase('copy_emulators'):
+            log.info(f'Copying QEMU binaries to: {target_bin_dir!r}')
+            for qemu_binary in qemu_binaries:
+                if not os.path.exists(qemu_binary):
+                    raise KiwiFileNotFound(
+                        f'QEMU binary {qemu_binary!r} not found'
+                    )
+                log.info(f'--> {qemu_binary}')
+                shutil.copy(qemu_binary, target_bin_dir)
+                emulator_files.append(
+                    os.sep.join([target_bin_dir, os.path.basename(qemu_binary)])
                 )
-            log.info(f'--> {qemu_binary}')
-            shutil.copy(qemu_binary, target_bin_dir)
-
-        if os.path.exists('/usr/sbin/mkfs.btrfs.static'):
-            # path from qemu binfmt helper
-            host_arch = 'x86_64'
-            emul_dir = f'{host_arch}-for-{qemu_arch}'
-            target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'sbin' ]
-            Path.create(os.sep.join(target_emul_dir))
-            target_emul_dir.append('mkfs.btrfs')
-            shutil.copy('/usr/sbin/mkfs.btrfs.static', os.sep.join(target_emul_dir))
-
-        if os.path.exists('/usr/sbin/btrfs.static'):
-            # path from qemu binfmt helper
-            host_arch = 'x86_64'
-            emul_dir = f'{host_arch}-for-{qemu_arch}'
-            target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'sbin' ]
-            Path.create(os.sep.join(target_emul_dir))
-            target_emul_dir.append('btrfs')
-            shutil.copy('/usr/sbin/btrfs.static', os.sep.join(target_emul_dir))
-            target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'sbin' ]
-            Path.create(os.sep.join(target_emul_dir))
-            target_emul_dir.append('btrfs')
-            shutil.copy('/usr/sbin/btrfs.static', os.sep.join(target_emul_dir))
-
-        if os.path.exists('/usr/bin/xz.static'):
-            # path from qemu binfmt helper
-            host_arch = 'x86_64'
-            emul_dir = f'{host_arch}-for-{qemu_arch}'
-            target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'bin' ]
-            Path.create(os.sep.join(target_emul_dir))
-            target_emul_dir.append('xz')
-            shutil.copy('/usr/bin/xz.static', os.sep.join(target_emul_dir))
-
-        if os.path.exists('/usr/bin/zstd.static'):
-            # path from qemu binfmt helper
-            host_arch = 'x86_64'
-            emul_dir = f'{host_arch}-for-{qemu_arch}'
-            target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'bin' ]
-            Path.create(os.sep.join(target_emul_dir))
-            target_emul_dir.append('zstd')
-            shutil.copy('/usr/bin/zstd.static', os.sep.join(target_emul_dir))
+                progress.file_copied(qemu_binary, emulator_files[-1])
+
+            if os.path.exists('/usr/sbin/mkfs.btrfs.static'):
+                # path from qemu binfmt helper
+                host_arch = 'x86_64'
+                emul_dir = f'{host_arch}-for-{qemu_arch}'
+                target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'sbin' ]
+                Path.create(os.sep.join(target_emul_dir))
+                target_emul_dir.append('mkfs.btrfs')
+                shutil.copy('/usr/sbin/mkfs.btrfs.static', os.sep.join(target_emul_dir))
+                emulator_files.append(os.sep.join(target_emul_dir))
+                progress.file_copied('/usr/sbin/mkfs.btrfs.static', emulator_files[-1])
+
+            if os.path.exists('/usr/sbin/btrfs.static'):
+                # path from qemu binfmt helper
+                host_arch = 'x86_64'
+                emul_dir = f'{host_arch}-for-{qemu_arch}'
+                target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'sbin' ]
+                Path.create(os.sep.join(target_emul_dir))
+                target_emul_dir.append('btrfs')
+                shutil.copy('/usr/sbin/btrfs.static', os.sep.join(target_emul_dir))
+                emulator_files.append(os.sep.join(target_emul_dir))
+                progress.file_copied('/usr/sbin/btrfs.static', emulator_files[-1])
+                target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'sbin' ]
+                Path.create(os.sep.join(target_emul_dir))
+                target_emul_dir.append('btrfs')
+                shutil.copy('/usr/sbin/btrfs.static', os.sep.join(target_emul_dir))
+                emulator_files.append(os.sep.join(target_emul_dir))
+                progress.file_copied('/usr/sbin/btrfs.static', emulator_files[-1])
+
+            if os.path.exists('/usr/bin/xz.static'):
+                # path from qemu binfmt helper
+                host_arch = 'x86_64'
+                emul_dir = f'{host_arch}-for-{qemu_arch}'
+                target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'bin' ]
+                Path.create(os.sep.join(target_emul_dir))
+                target_emul_dir.append('xz')
+                shutil.copy('/usr/bin/xz.static', os.sep.join(target_emul_dir))
+                emulator_files.append(os.sep.join(target_emul_dir))
+                progress.file_copied('/usr/bin/xz.static', emulator_files[-1])
+
+            if os.path.exists('/usr/bin/zstd.static'):
+                # path from qemu binfmt helper
+                host_arch = 'x86_64'
+                emul_dir = f'{host_arch}-for-{qemu_arch}'
+                target_emul_dir = [ target_dir, 'build', 'image-root', 'emul', emul_dir, 'usr', 'bin' ]
+                Path.create(os.sep.join(target_emul_dir))
+                target_emul_dir.append('zstd')
+                shutil.copy('/usr/bin/zstd.static', os.sep.join(target_emul_dir))
+                emulator_files.append(os.sep.join(target_emul_dir))
+                progress.file_copied('/usr/bin/zstd.static', emulator_files[-1])
 
         # Call init binary
         if os.path.isfile('/.dockerenv.privileged'):
             log.warning('kiwi cross architecture setup is disabled in privileged docker. Ensure binfmtmisc handler got enabled external before')
             return
 
+        if self.command_args.get('--warmup-cache'):
+            with progress.phase('warmup_cache') as warmup_result:
+                warmup_result['warmup_time'] = self.warmup_page_cache(
+                    emulator_files
+                )
+
         log.info(f'Calling init binary {init_binary!r}')
-        Command.run([init_binary])
+        with progress.phase('init'):
+            if progress_fd is None:
+                Command.run([init_binary])
+            else:
+                init_call = Command.call([init_binary])
+                progress.emit('init_started', pid=init_call.process.pid)
+                try:
+                    CommandProcess(init_call, 'init').poll()
+                finally:
+                    progress.emit(
+                        'init_finished', pid=init_call.process.pid,
+                        exit_status=init_call.process.returncode
+                    )
+
+    def warmup_page_cache(self, filenames: List[str]) -> float:
+        """
+        Advise the kernel to read the given files into the page cache
+
+        :param list filenames: list of file paths to preload
+
+        :return: time in seconds spent for the warm-up
+
+        :rtype: float
+        """
+        log.info('Warming up page cache for emulator binaries')
+        start = time.monotonic()
+        for filename in filenames:
+            log.info(f'--> {filename}')
+            try:
+                fd = os.open(filename, os.O_RDONLY)
+                try:
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    else:
+                        while os.read(fd, 1 << 20):
+                            pass
+                finally:
+                    os.close(fd)
+            except OSError as issue:
+                log.warning(f'Page cache warm-up failed for {filename}: {issue}')
+        warmup_time = time.monotonic() - start
+        log.info(f'Page cache warm-up took {warmup_time:.3f}s')
+        return warmup_time
+
+    def progress_fd(self) -> Optional[int]:
+        """
+        File descriptor from the --progress-fd option
+
+        :return: file descriptor number or None if not specified
+
+        :rtype: int
+        """
+        progress_fd = self.command_args.get('--progress-fd')
+        if not progress_fd:
+            return None
+        try:
+            fd = int(progress_fd)
+        except ValueError:
+            fd = -1
+        if fd < 0:
+            raise KiwiSystemCrossprepareProgressFdError(
+                f'progress file descriptor {progress_fd!r} is not a number >= 0'
+            )
+        return fd
 
     def is_docker_env(self) -> bool:
         if os.path.isfile('/.dockerenv.privileged'):
@@ -0,0 +1,95 @@
+import errno
+import json
+import os
+from pytest import raises
+from mock import patch
+
+from kiwi_crossprepare_plugin.progress import ProgressEvents
+
+from kiwi_crossprepare_plugin.exceptions import (
+    KiwiSystemCrossprepareProgressFdError
+)
+
+
+class TestProgressEvents:
+    def setup(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.progress = ProgressEvents(self.write_fd)
+
+    def setup_method(self, cls):
+        self.setup()
+
+    def teardown_method(self, cls):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+    def _events(self, mock_os_write):
+        return [
+            json.loads(write_call[0][1].decode())
+            for write_call in mock_os_write.call_args_list
+        ]
+
+    @patch('os.write')
+    def test_emit_without_fd(self, mock_os_write):
+        progress = ProgressEvents()
+        progress.emit('phase_start', phase='init')
+        progress.file_copied('/usr/bin/qemu-x86_64', '/root/usr/bin')
+        assert not mock_os_write.called
+
+    @patch('os.write')
+    def test_phases(self, mock_os_write):
+        self.progress.phase_start('copy_emulators')
+        self.progress.phase_end('copy_emulators')
+        events = self._events(mock_os_write)
+        assert mock_os_write.call_args[0][0] == self.write_fd
+        assert events[0]['event'] == 'phase_start'
+        assert events[0]['phase'] == 'copy_emulators'
+        assert events[1]['event'] == 'phase_end'
+        assert events[1]['phase'] == 'copy_emulators'
+
+    @patch('os.fstat')
+    def test_init_raises_on_closed_fd(self, mock_os_fstat):
+        mock_os_fstat.side_effect = OSError(errno.EBADF, 'Bad file descriptor')
+        with raises(KiwiSystemCrossprepareProgressFdError):
+            ProgressEvents(99)
+        mock_os_fstat.assert_called_once_with(99)
+
+    @patch('os.write')
+    def test_phase(self, mock_os_write):
+        with self.progress.phase('copy_emulators') as result:
+            result['files'] = 3
+        with raises(RuntimeError):
+            with self.progress.phase('init'):
+                raise RuntimeError('init failed')
+        events = self._events(mock_os_write)
+        assert [
+            (event['event'], event['phase']) for event in events
+        ] == [
+            ('phase_start', 'copy_emulators'),
+            ('phase_end', 'copy_emulators'),
+            ('phase_start', 'init'),
+            ('phase_failed', 'init')
+        ]
+        assert events[1]['files'] == 3
+        assert events[3]['error'] == 'RuntimeError: init failed'
+
+    @patch('os.path.getsize')
+    @patch('os.write')
+    def test_file_copied(self, mock_os_write, mock_os_path_getsize):
+        mock_os_path_getsize.return_value = 1024
+        self.progress.file_copied('/usr/bin/xz.static', '/root/usr/bin/xz')
+        self.progress.file_copied('/usr/bin/zstd.static', '/root/usr/bin/zstd')
+        events = self._events(mock_os_write)
+        assert events[1]['event'] == 'file_copied'
+        assert events[1]['source'] == '/usr/bin/zstd.static'
+        assert events[1]['target'] == '/root/usr/bin/zstd'
+        assert events[1]['bytes'] == 1024
+        assert events[1]['total_bytes'] == 2048
+
+    @patch('os.write')
+    def test_emit_disables_on_write_error(self, mock_os_write):
+        mock_os_write.side_effect = BrokenPipeError('Broken pipe')
+        self.progress.emit('phase_start', phase='init')
+        assert self.progress.fd is None
+        self.progress.emit('phase_end', phase='init')
+        assert mock_os_write.call_count == 1
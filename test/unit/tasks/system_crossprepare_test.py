@@ -1,21 +1,33 @@
+import errno
+import json
+import logging
+import os
 import sys
-from pytest import raises
+from pytest import (
+    raises, fixture
+)
 from mock import (
     Mock, patch, call
 )
 from kiwi_crossprepare_plugin.tasks.system_crossprepare import SystemCrossprepareTask
 
 from kiwi.exceptions import (
+    KiwiCommandError,
     KiwiFileNotFound,
     KiwiRootDirExists
 )
 
 from kiwi_crossprepare_plugin.exceptions import (
-    KiwiSystemCrossprepareUnsupportedEnvironmentError
+    KiwiSystemCrossprepareUnsupportedEnvironmentError,
+    KiwiSystemCrossprepareProgressFdError
 )
 
 
 class TestSystemCrossprepareTask:
+    @fixture(autouse=True)
+    def inject_fixtures(self, caplog):
+        self._caplog = caplog
+
     def setup(self):
         sys.argv = [
             sys.argv[0],
@@ -36,6 +48,8 @@ class TestSystemCrossprepareTask:
         self.task.command_args['--target-arch'] = 'x86_64'
         self.task.command_args['--init'] = '/some/qemu/binfmt/init'
         self.task.command_args['--allow-existing-root'] = False
+        self.task.command_args['--warmup-cache'] = False
+        self.task.command_args['--progress-fd'] = None
         self.task.command_args['--target-dir'] = '../data/target_dir'
 
     @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.Help')
@@ -101,7 +115,8 @@ class TestSystemCrossprepareTask:
         mock_shutil_copy
     ):
         mock_is_docker_env.return_value = False
-        mock_os_path_isfile.return_value = True
+        mock_os_path_isfile.side_effect = lambda path: \
+            path != '/.dockerenv.privileged'
         mock_os_path_isdir.return_value = False
         init_dir = Mock()
         init_dir.name = '/tmp/initvm_X'
@@ -117,10 +132,14 @@ class TestSystemCrossprepareTask:
         mock_TemporaryDirectory.reset_mock()
         mock_shutil_copy.reset_mock()
         mock_Path_create.reset_mock()
-        mock_os_path_exists.return_value = True
+        mock_os_path_exists.side_effect = lambda path: \
+            path != '/usr/bin/xz.static' and \
+            path != '/usr/bin/zstd.static'
 
         self.task.process()
 
+        emul_dir = '../data/target_dir/build/image-root/emul/' \
+            'x86_64-for-x86_64'
         mock_TemporaryDirectory.assert_called_once_with(
             prefix='initvm_'
         )
@@ -137,12 +156,278 @@ class TestSystemCrossprepareTask:
             call(
                 '/usr/bin/qemu-x86_64',
                 '../data/target_dir/build/image-root/usr/bin'
+            ),
+            call(
+                '/usr/sbin/mkfs.btrfs.static',
+                f'{emul_dir}/usr/sbin/mkfs.btrfs'
+            ),
+            call(
+                '/usr/sbin/btrfs.static',
+                f'{emul_dir}/usr/sbin/btrfs'
+            ),
+            call(
+                '/usr/sbin/btrfs.static',
+                f'{emul_dir}/sbin/btrfs'
             )
         ]
         assert mock_Path_create.call_args_list == [
             call('../data/target_dir/build/image-root/usr/bin'),
-            call('../data/target_dir/build/image-root/image')
+            call('../data/target_dir/build/image-root/image'),
+            call(f'{emul_dir}/usr/sbin'),
+            call(f'{emul_dir}/usr/sbin'),
+            call(f'{emul_dir}/sbin')
         ]
         mock_Command_run.assert_called_once_with(
             ['/tmp/initvm_X/init']
         )
+
+        # init is not called in a privileged docker environment
+        mock_Command_run.reset_mock()
+        mock_os_path_isfile.side_effect = None
+        mock_os_path_isfile.return_value = True
+
+        self.task.process()
+
+        assert not mock_Command_run.called
+
+    @patch('shutil.copy')
+    @patch('os.chmod')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.TemporaryDirectory')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.Path.create')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.Command.run')
+    @patch('os.path.isfile')
+    @patch('os.path.isdir')
+    @patch('os.path.exists')
+    @patch.object(SystemCrossprepareTask, 'warmup_page_cache')
+    @patch.object(SystemCrossprepareTask, 'is_docker_env')
+    def test_process_warmup_cache(
+        self, mock_is_docker_env, mock_warmup_page_cache, mock_os_path_exists,
+        mock_os_path_isdir, mock_os_path_isfile, mock_Command_run,
+        mock_Path_create, mock_TemporaryDirectory, mock_os_chmod,
+        mock_shutil_copy
+    ):
+        mock_is_docker_env.return_value = False
+        mock_os_path_isfile.side_effect = lambda path: \
+            path != '/.dockerenv.privileged'
+        mock_os_path_isdir.return_value = False
+        mock_os_path_exists.side_effect = lambda path: \
+            path != '/usr/sbin/mkfs.btrfs.static' and \
+            path != '/usr/sbin/btrfs.static'
+        init_dir = Mock()
+        init_dir.name = '/tmp/initvm_X'
+        mock_TemporaryDirectory.return_value = init_dir
+        self._init_command_args()
+        self.task.command_args['crossprepare'] = True
+        self.task.command_args['--allow-existing-root'] = True
+        self.task.command_args['--warmup-cache'] = True
+
+        self.task.process()
+
+        emul_dir = '../data/target_dir/build/image-root/emul/' \
+            'x86_64-for-x86_64'
+        mock_warmup_page_cache.assert_called_once_with(
+            [
+                '../data/target_dir/build/image-root/usr/bin/qemu-binfmt',
+                '../data/target_dir/build/image-root/usr/bin/'
+                'qemu-x86_64-binfmt',
+                '../data/target_dir/build/image-root/usr/bin/qemu-x86_64',
+                f'{emul_dir}/usr/bin/xz',
+                f'{emul_dir}/usr/bin/zstd'
+            ]
+        )
+        mock_Command_run.assert_called_once_with(
+            ['/tmp/initvm_X/init']
+        )
+
+    @patch('os.close')
+    @patch('os.posix_fadvise')
+    @patch('os.open')
+    def test_warmup_page_cache(
+        self, mock_os_open, mock_os_posix_fadvise, mock_os_close
+    ):
+        mock_os_open.return_value = 42
+        assert self.task.warmup_page_cache(
+            ['/root/usr/bin/qemu-aarch64']
+        ) >= 0
+        mock_os_open.assert_called_once_with(
+            '/root/usr/bin/qemu-aarch64', os.O_RDONLY
+        )
+        mock_os_posix_fadvise.assert_called_once_with(
+            42, 0, 0, os.POSIX_FADV_WILLNEED
+        )
+        mock_os_close.assert_called_once_with(42)
+
+    @patch('os.close')
+    @patch('os.read')
+    @patch('os.open')
+    def test_warmup_page_cache_read_fallback(
+        self, mock_os_open, mock_os_read, mock_os_close
+    ):
+        mock_os_open.return_value = 42
+        mock_os_read.side_effect = [b'data', b'']
+        with patch.dict(os.__dict__):
+            del os.__dict__['posix_fadvise']
+            self.task.warmup_page_cache(['/root/usr/bin/qemu-aarch64'])
+        assert mock_os_read.call_args_list == [
+            call(42, 1 << 20), call(42, 1 << 20)
+        ]
+        mock_os_close.assert_called_once_with(42)
+
+    @patch('os.close')
+    @patch('os.posix_fadvise')
+    @patch('os.open')
+    def test_warmup_page_cache_ignores_errors(
+        self, mock_os_open, mock_os_posix_fadvise, mock_os_close
+    ):
+        mock_os_open.side_effect = [
+            PermissionError('Permission denied'), 42
+        ]
+        with self._caplog.at_level(logging.WARNING):
+            self.task.warmup_page_cache(
+                ['/root/usr/bin/qemu-binfmt', '/root/usr/bin/qemu-aarch64']
+            )
+        assert 'Page cache warm-up failed for /root/usr/bin/qemu-binfmt' in \
+            self._caplog.text
+        mock_os_posix_fadvise.assert_called_once_with(
+            42, 0, 0, os.POSIX_FADV_WILLNEED
+        )
+        mock_os_close.assert_called_once_with(42)
+
+    @patch('os.fstat')
+    @patch('os.path.isfile')
+    @patch.object(SystemCrossprepareTask, 'is_docker_env')
+    def test_process_raises_invalid_progress_fd(
+        self, mock_is_docker_env, mock_os_path_isfile, mock_os_fstat
+    ):
+        mock_is_docker_env.return_value = False
+        mock_os_path_isfile.return_value = True
+        mock_os_fstat.side_effect = OSError(errno.EBADF, 'Bad file descriptor')
+        self._init_command_args()
+        self.task.command_args['crossprepare'] = True
+        self.task.command_args['--allow-existing-root'] = True
+        for progress_fd in ['foo', '\u00b2', '-1', '99']:
+            self.task.command_args['--progress-fd'] = progress_fd
+            with raises(KiwiSystemCrossprepareProgressFdError):
+                self.task.process()
+        mock_os_fstat.assert_called_once_with(99)
+
+    @patch('shutil.copy')
+    @patch('os.chmod')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.TemporaryDirectory')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.Path.create')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.CommandProcess')
+    @patch('kiwi_crossprepare_plugin.tasks.system_crossprepare.Command.call')
+    @patch('os.path.getsize')
+    @patch('os.path.isfile')
+    @patch('os.path.isdir')
+    @patch('os.path.exists')
+    @patch.object(SystemCrossprepareTask, 'is_docker_env')
+    def _process_with_progress_pipe(
+        self, mock_is_docker_env, mock_os_path_exists, mock_os_path_isdir,
+        mock_os_path_isfile, mock_os_path_getsize, mock_Command_call,
+        mock_CommandProcess, mock_Path_create, mock_TemporaryDirectory,
+        mock_os_chmod, mock_shutil_copy, qemu_binary_exists=True,
+        init_error=None, warmup_cache=False
+    ):
+        read_fd, write_fd = os.pipe()
+        init_dir = Mock()
+        init_dir.name = '/tmp/initvm_X'
+        mock_TemporaryDirectory.return_value = init_dir
+        init_call = Mock()
+        init_call.process.pid = 4711
+        init_call.process.returncode = 1 if init_error else 0
+        mock_Command_call.return_value = init_call
+        mock_CommandProcess.return_value.poll.side_effect = init_error
+        mock_is_docker_env.return_value = False
+        mock_os_path_isfile.side_effect = lambda path: \
+            path != '/.dockerenv.privileged'
+        mock_os_path_isdir.return_value = False
+        mock_os_path_exists.side_effect = lambda path: \
+            qemu_binary_exists and path.startswith('/usr/bin/qemu-')
+        mock_os_path_getsize.return_value = 1024
+        self._init_command_args()
+        self.task.command_args['crossprepare'] = True
+        self.task.command_args['--allow-existing-root'] = True
+        self.task.command_args['--progress-fd'] = str(write_fd)
+        self.task.command_args['--warmup-cache'] = warmup_cache
+        issue = None
+        try:
+            self.task.process()
+        except Exception as process_issue:
+            issue = process_issue
+        finally:
+            os.close(write_fd)
+        with os.fdopen(read_fd) as progress_stream:
+            events = [json.loads(line) for line in progress_stream]
+        return events, issue
+
+    def test_process_progress_events(self):
+        events, issue = self._process_with_progress_pipe()
+        assert issue is None
+        assert [
+            (event['event'], event.get('phase')) for event in events
+        ] == [
+            ('phase_start', 'copy_emulators'),
+            ('file_copied', None),
+            ('file_copied', None),
+            ('file_copied', None),
+            ('phase_end', 'copy_emulators'),
+            ('phase_start', 'init'),
+            ('init_started', None),
+            ('init_finished', None),
+            ('phase_end', 'init')
+        ]
+        assert events[3]['source'] == '/usr/bin/qemu-x86_64'
+        assert events[3]['target'] == \
+            '../data/target_dir/build/image-root/usr/bin/qemu-x86_64'
+        assert events[3]['bytes'] == 1024
+        assert events[3]['total_bytes'] == 3072
+        assert events[6]['pid'] == 4711
+        assert events[7]['pid'] == 4711
+        assert events[7]['exit_status'] == 0
+
+    @patch.object(SystemCrossprepareTask, 'warmup_page_cache')
+    def test_process_progress_events_warmup_cache(
+        self, mock_warmup_page_cache
+    ):
+        mock_warmup_page_cache.return_value = 0.25
+        events, issue = self._process_with_progress_pipe(warmup_cache=True)
+        assert issue is None
+        warmup_events = [
+            event for event in events
+            if event.get('phase') == 'warmup_cache'
+        ]
+        assert [event['event'] for event in warmup_events] == [
+            'phase_start', 'phase_end'
+        ]
+        assert warmup_events[1]['warmup_time'] == 0.25
+
+    def test_process_progress_events_qemu_binary_not_found(self):
+        events, issue = self._process_with_progress_pipe(
+            qemu_binary_exists=False
+        )
+        assert isinstance(issue, KiwiFileNotFound)
+        assert [
+            (event['event'], event.get('phase')) for event in events
+        ] == [
+            ('phase_start', 'copy_emulators'),
+            ('phase_failed', 'copy_emulators')
+        ]
+        assert events[1]['error'] == \
+            "KiwiFileNotFound: QEMU binary '/usr/bin/qemu-binfmt' not found"
+
+    def test_process_progress_events_init_failed(self):
+        events, issue = self._process_with_progress_pipe(
+            init_error=KiwiCommandError('init failed')
+        )
+        assert isinstance(issue, KiwiCommandError)
+        assert [
+            (event['event'], event.get('phase')) for event in events
+        ][-4:] == [
+            ('phase_start', 'init'),
+            ('init_started', None),
+            ('init_finished', None),
+            ('phase_failed', 'init')
+        ]
+        assert events[-2]['exit_status'] == 1
+        assert events[-1]['error'] == 'KiwiCommandError: init failed'